@@ -6,12 +6,14 @@ database.
 
 from __future__ import print_function
 
-from datetime import datetime
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from netCDF4 import date2num
+from queue import Queue, Empty, Full
 from PyFVCOM.utilities.general import PassiveStore, warn
 
 import numpy as np
+import pandas as pd
 
 try:
     import sqlite3
@@ -21,6 +23,336 @@ except ImportError:
          'installation. Some functions will be disabled.')
     use_sqlite = False
 
+# Number of rows to pull from the database at a time in get_buoy_data.
+_fetch_size = 10000
+
+# Idle read-only connections and cached schemas and queries for each database (see _Pool), keyed on the absolute path
+# to the database file. The lock covers _pools and everything in each _Pool except the queue (which has its own).
+_pool_size = 4
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class _Pool(object):
+    """ The idle connections to a database and what we've cached about it, all from one version of the file. """
+
+    def __init__(self, identity):
+        """
+        Parameters
+        ----------
+        identity : tuple, None
+            The identity of the database file when the pool was made (from _db_identity).
+
+        """
+
+        self.identity = identity
+        self.connections = Queue(maxsize=_pool_size)
+        # Table schemas, keyed on the lower case table name. Each value is the table name as declared and a dict of
+        # the declared column names and types keyed on the lower case column name.
+        self.schemas = {}
+        # SQL for the queries made by get_buoy_data and get_buoy_data_columnar, keyed on (table, fields) with the names
+        # as declared in the database. Each value is the row count query and the select query.
+        self.statements = {}
+
+
+def _db_key(db):
+    """
+    Get the key for a database in the connection pools and the schema and statement caches.
+
+    Parameters
+    ----------
+    db : str
+        Full path to the buoy data SQLite database.
+
+    Returns
+    -------
+    key : str
+        Absolute path to the database with any symbolic links resolved.
+
+    """
+
+    return str(Path(db).resolve())
+
+
+def _db_identity(path):
+    """
+    Identify the current version of a database file so we notice when it's been rebuilt or modified.
+
+    Parameters
+    ----------
+    path : str
+        Absolute path to the SQLite database.
+
+    Returns
+    -------
+    identity : tuple, None
+        The inode, modification time and size of the file, or None if it doesn't exist.
+
+    """
+
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _forget_database(path):
+    """
+    Close the idle connections to a database and drop its cached schemas and statements. Must be called with
+    _pools_lock held. Connections which are in use are closed instead of being returned to the dropped pool.
+
+    Parameters
+    ----------
+    path : str
+        Absolute path to the SQLite database (from _db_key).
+
+    """
+
+    pool = _pools.pop(path, None)
+    if pool is not None:
+        while True:
+            try:
+                pool.connections.get_nowait().close()
+            except Empty:
+                break
+
+
+def close_buoy_connections(db=None):
+    """
+    Close the pooled connections to the buoy databases and clear the cached table schemas and queries. Connections in
+    use are closed when they're finished with.
+
+    This happens automatically for a database file which has been changed since it was last read, so this is only
+    needed to release the connections (e.g. before deleting the database).
+
+    Parameters
+    ----------
+    db : str, optional
+        Full path to the buoy data SQLite database. If omitted, all the databases are closed.
+
+    """
+
+    with _pools_lock:
+        if db is None:
+            paths = list(_pools)
+        else:
+            paths = [_db_key(db)]
+        for path in paths:
+            _forget_database(path)
+
+
+def _open_connection(path):
+    """
+    Open a read-only connection to the given SQLite database.
+
+    Parameters
+    ----------
+    path : str
+        Absolute path to the SQLite database.
+
+    Returns
+    -------
+    con : sqlite3.Connection
+        The new connection. It may be used from any thread.
+
+    """
+
+    con = sqlite3.connect('{}?mode=ro'.format(Path(path).as_uri()), uri=True, check_same_thread=False,
+                          isolation_level=None, cached_statements=256)
+    # A 64 MiB page cache and memory mapped I/O make repeated reads of the same tables cheap.
+    con.execute('PRAGMA cache_size=-65536')
+    con.execute('PRAGMA mmap_size=268435456')
+
+    return con
+
+
+@contextmanager
+def _get_conn(db):
+    """
+    Borrow a connection to the given database from the pool, opening a new one if none are idle. The connection is
+    returned to the pool when we're done with it, unless an error occurred, in which case it is closed. If the database
+    file has changed since the pool was made, the idle connections and cached schemas are thrown away first.
+
+    Parameters
+    ----------
+    db : str
+        Full path to the buoy data SQLite database.
+
+    Yields
+    ------
+    con : sqlite3.Connection
+        Read-only connection to `db'.
+    pool : _Pool
+        The pool `con' belongs to, for looking up the cached schemas and queries (see _table_schema). Anything cached
+        there goes with the pool when the database changes, even if `con' was reading the old file.
+
+    """
+
+    path = _db_key(db)
+    identity = _db_identity(path)
+    with _pools_lock:
+        if path in _pools and _pools[path].identity != identity:
+            _forget_database(path)
+        if path not in _pools:
+            _pools[path] = _Pool(identity)
+        pool = _pools[path]
+
+    try:
+        con = pool.connections.get_nowait()
+    except Empty:
+        con = _open_connection(path)
+
+    try:
+        yield con, pool
+    except BaseException:
+        con.close()
+        raise
+
+    with _pools_lock:
+        current = _pools.get(path) is pool
+    if not current:
+        # The database changed (or close_buoy_connections was called) while we were using this connection.
+        con.close()
+        return
+    try:
+        pool.connections.put_nowait(con)
+    except Full:
+        con.close()
+
+
+def _quote_identifier(name):
+    """
+    Quote a table or column name for use in an SQLite query.
+
+    Parameters
+    ----------
+    name : str
+        The identifier to quote.
+
+    Returns
+    -------
+    quoted : str
+        The identifier in double quotes with any embedded double quotes escaped.
+
+    """
+
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _table_schema(con, pool, table):
+    """
+    Check a table exists in the database and get its columns. The result is cached, so each table is only looked up
+    once.
+
+    Parameters
+    ----------
+    con : sqlite3.Connection
+        Connection to the database.
+    pool : _Pool
+        The pool `con' came from, which holds the cache.
+    table : str
+        Name of the table (case insensitive).
+
+    Returns
+    -------
+    name : str
+        The table name as declared in the database.
+    columns : dict
+        The declared name and type of each column, keyed on the lower case column name.
+
+    """
+
+    key = table.lower()
+    with _pools_lock:
+        schema = pool.schemas.get(key)
+    if schema is None:
+        known = con.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name = ? COLLATE NOCASE",
+                            (table,)).fetchone()
+        if known is None:
+            raise sqlite3.OperationalError('no such table: {}'.format(table))
+        name = known[0]
+        columns = {i[1].lower(): (i[1], i[2]) for i in con.execute('PRAGMA table_info({})'.format(_quote_identifier(name)))}
+        with _pools_lock:
+            schema = pool.schemas.setdefault(key, (name, columns))
+
+    return schema
+
+
+def _buoy_data_statements(con, pool, table, fields):
+    """
+    Make the SQL to extract the given fields from a table, checking the table and fields exist in the database first.
+    The table and field names are normalised to their declared case, so the same extraction always gives the same SQL
+    (and therefore reuses the connection's compiled statements) however the names are capitalised.
+
+    Parameters
+    ----------
+    con : sqlite3.Connection
+        Connection to the database.
+    pool : _Pool
+        The pool `con' came from, which holds the cache.
+    table : str
+        Name of the table to be extracted.
+    fields : list
+        List of names of fields to extract for the given table.
+
+    Returns
+    -------
+    count_sql : str
+        Query for the number of rows in `table'.
+    select_sql : str
+        Query for `fields' from `table'.
+    types : tuple
+        The declared SQLite type of each field.
+
+    """
+
+    # We have to check the names ourselves: SQLite treats a quoted identifier which doesn't match a column as a
+    # string literal rather than raising an error. Names are case insensitive in SQLite.
+    table, columns = _table_schema(con, pool, table)
+    for field in fields:
+        if field.lower() not in columns:
+            raise sqlite3.OperationalError('no such column: {}'.format(field))
+    if not fields:
+        raise sqlite3.OperationalError('no fields given for table: {}'.format(table))
+    fields, types = zip(*[columns[i.lower()] for i in fields])
+
+    key = (table, fields)
+    with _pools_lock:
+        statements = pool.statements.get(key)
+    if statements is None:
+        quoted_table = _quote_identifier(table)
+        count_sql = 'SELECT COUNT(*) FROM {}'.format(quoted_table)
+        select_sql = 'SELECT {} FROM {}'.format(','.join(_quote_identifier(i) for i in fields), quoted_table)
+        with _pools_lock:
+            statements = pool.statements.setdefault(key, (count_sql, select_sql))
+
+    return statements + (types,)
+
+
+def _detect_delimiter(line):
+    """
+    Find the delimiter used in a line of an ASCII file by trying a few common ones.
+
+    Parameters
+    ----------
+    line : str
+        String to check.
+
+    Returns
+    -------
+    delimiter : str
+        The first of semicolon, comma, tab and space found in `line'. None if none of them are present.
+
+    """
+
+    for d in (';', ',', '\t', ' '):
+        if d in line:
+            return d
+
+    return None
+
 
 def _split_lines(line, remove_empty=False, remove_trailing=False):
     """
@@ -40,25 +372,48 @@ def _split_lines(line, remove_empty=False, remove_trailing=False):
     y : list
         The split string.
 
+    See Also
+    --------
+    buoy._split_lines_with_delim : split many lines with a known delimiter.
+
     """
 
-    delimiters = (';', ',', '\t', ' ')
-    delimiter = None
-    for d in delimiters:
-        if d in line:
-            delimiter = d
-            break
+    return _split_lines_with_delim(line, _detect_delimiter(line), remove_empty=remove_empty,
+                                   remove_trailing=remove_trailing)
 
-    # Clear out newlines.
-    line = line.strip('\n')
 
-    if remove_trailing:
-        line = delimiter.join(line.rstrip(delimiter).split(delimiter))
+def _split_lines_with_delim(line, delimiter, remove_empty=False, remove_trailing=False):
+    """
+    As _split_lines, but with a known delimiter. Use this when splitting all the lines in a file to save looking
+    for the delimiter on every line.
 
-    y = line.split(delimiter)
+    Parameters
+    ----------
+    line : str
+        String to split.
+    delimiter : str
+        The delimiter to split on. None splits on runs of whitespace.
+    remove_empty : bool, optional
+        Set to True to remove empty columns. Defaults to leaving them in.
+    remove_trailing : bool, optional
+        Set to True to remove trailing empty columns. Defaults to leaving them in.
+
+    Returns
+    -------
+    y : list
+        The split string.
+
+    """
+
+    # Clear out newlines and split once; everything else works on the split line.
+    y = line.rstrip('\n').split(delimiter)
+
+    if remove_trailing:
+        while len(y) > 1 and not y[-1]:
+            y.pop()
 
     if remove_empty:
-        y = [i.strip() for i in line.split(delimiter) if i]
+        y = [i.strip() for i in y if i]
 
     return y
 
@@ -85,24 +440,56 @@ def get_buoy_metadata(db):
                            'installation. This function (get_buoy_metadata) '
                            'is unavailable.')
 
-    def _dict_factory(cursor, row):
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            d[col[0]] = row[idx]
-        return d
-
     meta_info = [False]
     try:
-        with sqlite3.connect(db) as con:
-            con.row_factory = _dict_factory
-            c = con.cursor()
-            meta_info = c.execute('SELECT * from Stations').fetchall()
+        with _get_conn(db) as (con, _):
+            c = con.execute('SELECT * from Stations')
+            # Use the C row factory rather than building each dict in Python. It's set on the cursor so it doesn't
+            # leak onto the pooled connection.
+            c.row_factory = sqlite3.Row
+            meta_info = [dict(i) for i in c.fetchall()]
     except sqlite3.Error as e:
         print('Error %s: {}'.format(e.args[0]))
 
     return meta_info
 
 
+def get_buoy_metadata_df(db):
+    """
+    Extracts the meta data from the buoy database as a pandas DataFrame. This is much faster than get_buoy_metadata
+    for large Stations tables since there's no Python object created for each station.
+
+    Parameters
+    ----------
+    db : str
+        Full path to the buoy data SQLite database.
+
+    Returns
+    -------
+    meta_info : pandas.DataFrame
+        The Stations table with a column for each field. Returns an empty DataFrame if there is an error.
+
+    See Also
+    --------
+    buoy.get_buoy_metadata : extract the metadata as a list of dicts.
+
+    """
+
+    if not use_sqlite:
+        raise RuntimeError('No sqlite standard library found in this python '
+                           'installation. This function (get_buoy_metadata_df) '
+                           'is unavailable.')
+
+    meta_info = pd.DataFrame()
+    try:
+        with _get_conn(db) as (con, _):
+            meta_info = pd.read_sql_query('SELECT * from Stations', con)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print('Error %s:' % e.args[0])
+
+    return meta_info
+
+
 def get_buoy_data(db, table, fields, noisy=False):
     """
     Extract the buoy from the SQLite database for a given site.  Specify the
@@ -145,10 +532,30 @@ def get_buoy_data(db, table, fields, noisy=False):
         print('Getting data for {} from the database...'.format(table), end=' ')
 
     try:
-        with sqlite3.connect(db) as con:
-            c = con.cursor()
-            # I know, using a string is Bad. But it works and it's only me # working with this.
-            data = np.asarray(c.execute('SELECT {} FROM {}'.format(','.join(fields), table)).fetchall()).astype(float)
+        with _get_conn(db) as (con, pool):
+            count_sql, select_sql, _ = _buoy_data_statements(con, pool, table, fields)
+            num_rows = con.execute(count_sql).fetchone()[0]
+            # Everything ends up as floats, so don't bother decoding any TEXT values to str first: numpy converts bytes
+            # just the same. This is a connection setting, so put it back before the connection returns to the pool.
+            con.text_factory = bytes
+            try:
+                c = con.execute(select_sql)
+                # Fill a preallocated array in chunks rather than building a list of tuples for the whole table first.
+                # numpy converts the Nones (NULLs) to NaNs for us on assignment.
+                data = np.empty((num_rows, len(fields)), dtype=float)
+                start = 0
+                rows = c.fetchmany(_fetch_size)
+                while rows:
+                    if start + len(rows) > data.shape[0]:
+                        # The table grew between the count and the select.
+                        data = np.resize(data, (start + len(rows), len(fields)))
+                    data[start:start + len(rows)] = rows
+                    start += len(rows)
+                    rows = c.fetchmany(_fetch_size)
+            finally:
+                con.text_factory = str
+            # Trim in case the table shrank instead.
+            data = data[:start]
         if noisy:
             print('done.')
     except sqlite3.Error as e:
@@ -158,6 +565,158 @@ def get_buoy_data(db, table, fields, noisy=False):
     return data
 
 
+def _sqlite_dtype(declared):
+    """
+    Map a declared SQLite column type to a numpy dtype using SQLite's type affinity rules.
+
+    Parameters
+    ----------
+    declared : str
+        The column type as given in the table definition (e.g. 'INTEGER', 'REAL', 'VARCHAR(10)').
+
+    Returns
+    -------
+    dtype : numpy.dtype
+        The numpy type to use for the column.
+
+    """
+
+    declared = declared.upper()
+    if 'INT' in declared:
+        return np.dtype(np.int64)
+    elif any(i in declared for i in ('CHAR', 'CLOB', 'TEXT')) or not declared or 'BLOB' in declared:
+        return np.dtype(object)
+    else:
+        # REAL and NUMERIC affinities.
+        return np.dtype(np.float64)
+
+
+def _convert_column(column, dtype, missing):
+    """
+    Convert a column of values from the database to the given type, checking nothing is lost on the way. SQLite types
+    are per value rather than per column, so a column's declared type doesn't guarantee what's actually in it (e.g.
+    text dates in a DATETIME column or a REAL in an INTEGER column).
+
+    Parameters
+    ----------
+    column : ndarray
+        Object array of the values.
+    dtype : numpy.dtype
+        The type to convert to.
+    missing : ndarray
+        Boolean array which is True for the NULLs in `column', which are skipped in the check.
+
+    Returns
+    -------
+    converted : ndarray, None
+        The converted values or None if they can't be represented as `dtype'.
+
+    """
+
+    try:
+        converted = column.astype(dtype)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    same = np.array(converted.astype(object) == column, dtype=bool)
+    if not np.all(same | missing):
+        return None
+
+    return converted
+
+
+def get_buoy_data_columnar(db, table, fields, noisy=False):
+    """
+    Extract the buoy data from the SQLite database for a given site as one typed array per field. This is like
+    get_buoy_data but keeps the column types and NULLs intact rather than forcing everything into a float array.
+
+    Parameters
+    ----------
+    db : str
+        Full path to the buoy data SQLite database.
+    table : str
+        Name of the table to be extracted (e.g. 'hastings_wavenet_site').
+    fields : list
+        List of names of fields to extract for the given table, such as
+        ['Depth', 'Temperature'].
+    noisy : bool, optional
+        Set to True to enable verbose output.
+
+    Returns
+    -------
+    data : dict
+        Arrays of each field requested from the table specified, keyed by the field name. INTEGER columns are int64,
+        REAL and NUMERIC columns float64 and everything else is an object array. Since SQLite types are per value, a
+        field with values its declared type can't hold (e.g. text dates in a DATETIME column) is an object array.
+    nulls : dict
+        Boolean arrays which are True where the corresponding value in `data' was NULL in the database. NULLs are NaN
+        in float64 arrays, 0 in int64 arrays and None in object arrays.
+
+    See Also
+    --------
+    buoy.get_buoy_data : extract the data as a single float array.
+
+    """
+
+    if not use_sqlite:
+        raise RuntimeError('No sqlite standard library found in this python '
+                           'installation. This function (get_buoy_data_columnar) is '
+                           'unavailable.')
+
+    if noisy:
+        print('Getting data for {} from the database...'.format(table), end=' ')
+
+    fill_values = {np.dtype(np.int64): 0, np.dtype(np.float64): np.nan, np.dtype(object): None}
+
+    try:
+        with _get_conn(db) as (con, pool):
+            count_sql, select_sql, types = _buoy_data_statements(con, pool, table, fields)
+            dtypes = [_sqlite_dtype(i) for i in types]
+            num_rows = con.execute(count_sql).fetchone()[0]
+            data = {name: np.empty(num_rows, dtype=dtype) for name, dtype in zip(fields, dtypes)}
+            nulls = {name: np.zeros(num_rows, dtype=bool) for name in fields}
+
+            c = con.execute(select_sql)
+            start = 0
+            rows = c.fetchmany(_fetch_size)
+            while rows:
+                end = start + len(rows)
+                if end > num_rows:
+                    # The table grew between the count and the select.
+                    for name in fields:
+                        data[name] = np.resize(data[name], end)
+                        nulls[name] = np.resize(nulls[name], end)
+                    num_rows = end
+                for i, (name, column) in enumerate(zip(fields, zip(*rows))):
+                    column = np.asarray(column, dtype=object)
+                    missing = np.equal(column, None)
+                    column[missing] = fill_values[dtypes[i]]
+                    if dtypes[i] != object:
+                        converted = _convert_column(column, dtypes[i], missing)
+                        if converted is None:
+                            # This column has values the declared type can't hold, so keep it as objects from now on
+                            # and put back the NULLs we've already filled.
+                            dtypes[i] = np.dtype(object)
+                            column[missing] = None
+                            data[name] = data[name].astype(object)
+                            data[name][:start][nulls[name][:start]] = None
+                        else:
+                            column = converted
+                    data[name][start:end] = column
+                    nulls[name][start:end] = missing
+                start = end
+                rows = c.fetchmany(_fetch_size)
+            for name in fields:
+                data[name] = data[name][:start]
+                nulls[name] = nulls[name][:start]
+        if noisy:
+            print('done.')
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        print('Error %s:' % e.args[0])
+        data, nulls = {}, {}
+
+    return data, nulls
+
+
 class Buoy(object):
     """ Generic class for buoy data (i.e. surface time series). """
 
@@ -201,17 +760,21 @@ class Buoy(object):
 
         # Get the metadata read in.
         self._slurp_file()
-        self.header, self.header_length, self.header_indices = _read_header(self._lines, self._time_header)
 
     def _slurp_file(self):
         """
-        Read in the contents of the file into self so we don't have to read each file multiple times.
+        Read in the header of the file into self so we don't have to read each file multiple times. The data are
+        parsed by pandas straight from the file in load(), so we stop at the first line of data.
 
         Provides
         --------
         self._lines : list
-            The lines in the file, stripped of newlines and leading/trailing whitespace and split based on trying a
-            few common delimiters.
+            The header lines in the file and the first line of data, stripped of newlines and leading/trailing
+            whitespace and split based on trying a few common delimiters.
+        self._sep : str
+            The delimiter for the data section of the file, for use with pandas.read_csv.
+        self.header, self.header_length, self.header_indices
+            The header information from _read_header.
 
         """
 
@@ -236,15 +799,41 @@ class Buoy(object):
                 empty = False
                 trailing = False
 
-            self._lines = f.readlines()
-            self._lines = [_split_lines(i, remove_empty=empty, remove_trailing=trailing) for i in self._lines]
+            # Find the delimiter once (from the first non-blank line) rather than for every line. Until we've got one,
+            # fall back to checking each line.
+            raw_lines = []
+            self._lines = []
+            time_names = set(self._time_header)
+            delimiter = None
+            found_data = False
+            for line in f:
+                if delimiter is None:
+                    delimiter = _detect_delimiter(line) if line.strip() else None
+                if delimiter is None:
+                    split_line = _split_lines(line, remove_empty=empty, remove_trailing=trailing)
+                else:
+                    split_line = _split_lines_with_delim(line, delimiter, remove_empty=empty, remove_trailing=trailing)
+                raw_lines.append(line)
+                self._lines.append(split_line)
+                # The header is the leading lines which include time variable names (see _read_header). We need at
+                # least one line after the header to find the data delimiter.
+                found_data = found_data or time_names.isdisjoint(split_line)
+                if found_data and len(self._lines) > 1:
+                    break
+
+        self.header, self.header_length, self.header_indices = _read_header(self._lines, self._time_header)
 
-            # If we've left empty columns in, replace them with NaNs. This is not elegant.
-            if not empty:
-                new_lines = []
-                for line in self._lines:
-                    new_lines.append([np.nan if i == '' else i for i in line])
-                self._lines = new_lines
+        # Work out the delimiter for the data (rather than the header) for pandas to parse the data with. Runs of
+        # whitespace are a single delimiter when we're removing empty columns (or if we haven't got a delimiter as
+        # that's what str.split(None) does).
+        if len(raw_lines) > self.header_length:
+            delimiter = _detect_delimiter(raw_lines[self.header_length])
+        else:
+            delimiter = _detect_delimiter(raw_lines[self.header_length - 1])
+        if delimiter is None or (empty and delimiter.isspace()):
+            self._sep = r'\s+'
+        else:
+            self._sep = delimiter
 
     def load(self):
         """
@@ -257,17 +846,20 @@ class Buoy(object):
 
         """
 
+        # Parse all the columns in a single pass and share them between the time and data.
+        columns = self._read_columns()
+
         # Add times.
-        self.time = self._ReadTime(self._lines)
+        self.time = self._ReadTime(self.header, self.header_indices, columns)
 
-        if not any(self.time.datetime):
+        if np.all(np.isnat(self.time.datetime)):
             return
 
         # Add positions
         self.position = self._ReadPosition(self._locations, self._site)
 
         # Grab the data.
-        self.data = self._ReadData(self._lines)
+        self.data = self._ReadData(self.header, self.header_indices, columns)
 
         # Replace missing values with NaNs.
         if self._missing is not None:
@@ -277,31 +869,69 @@ class Buoy(object):
                     values[values == self._missing] = np.nan
                     setattr(self.data, name, values)
 
+    def _read_columns(self):
+        """
+        Parse the data section of the file with pandas' C parser.
+
+        Returns
+        -------
+        columns : pandas.DataFrame
+            The data for each column in the header, labelled with its position in the header. Empty cells are NaN.
+            The time columns are left as strings.
+
+        """
+
+        usecols = sorted(set(self.header_indices.values()))
+        # Keep the times as strings so we don't lose leading zeros on the days of the year etc.
+        dtype = {self.header_indices[i]: str for i in self.header if i in self._time_header}
+        # Only skip the spaces after a delimiter when the delimiter isn't whitespace itself, otherwise runs of spaces
+        # in the space delimited files (which mark empty cells) collapse and the columns shift left.
+        skip_spaces = self._sep != r'\s+' and not self._sep.isspace()
+        try:
+            # Lines can have more columns than the header (e.g. trailing delimiters in the CEFAS data), which usecols
+            # takes care of for us, or fewer. Without names, pandas takes the number of columns from the first line of
+            # data, so naming every header column is what makes it pad a short first line with NaNs too.
+            columns = pd.read_csv(self._file, sep=self._sep, header=None, names=range(len(self.header)),
+                                  skiprows=self.header_length, usecols=usecols, dtype=dtype, na_values=[''],
+                                  engine='c', skipinitialspace=skip_spaces, encoding='ascii',
+                                  encoding_errors='ignore')
+        except pd.errors.EmptyDataError:
+            # Header only.
+            columns = pd.DataFrame(columns=usecols)
+
+        return columns
+
     class _Read(PassiveStore):
-        def __init__(self, lines, noisy=False):
+        def __init__(self, header, header_indices, columns, noisy=False):
             """
             Initialise parsing the buoy time series data so we can subclass this for the header and data reading.
 
             Parameters
             ----------
-            lines : list
-                The data to parse, read in by Buoys._slurp.
+            header : list
+                The header names, from Buoy._slurp_file.
+            header_indices : dict
+                Position of each header name in `header', from Buoy._slurp_file.
+            columns : pandas.DataFrame
+                The parsed data section of the file, from Buoy._read_columns.
             noisy : bool, optional
                 If True, verbose output is printed to screen. Defaults to False.
 
             Provides
             --------
-            Attributes in self which are named for each variable found in `lines'. Each attribute contains a single
+            Attributes in self which are named for each variable found in `header'. Each attribute contains a single
             time series as a numpy array.
 
             """
 
             self._debug = False
             self._noisy = noisy
-            self._lines = lines
+            self._columns = columns
             self._time_header = ['Year', 'Serial', 'Jd', 'Time', 'Time_GMT', 'Date_YYMMDD', 'Time_HHMMSS', 'Date/Time_GMT']
 
-            self._header, self._header_length, self._header_indices = _read_header(self._lines, self._time_header)
+            # The header is parsed once by the Buoy class and shared with each reader.
+            self._header = header
+            self._header_indices = header_indices
             self._read()
 
     class _ReadData(_Read):
@@ -309,102 +939,105 @@ class Buoy(object):
 
         def _read(self):
             """
-            Parse the data in self._lines for each of the time series.
+            Parse the data in self._columns for each of the time series.
 
             Provides
             --------
-            Attributes in self which are named for each variable found in `self._lines'. Each attribute contains a
+            Attributes in self which are named for each variable found in `self._columns'. Each attribute contains a
             single time series as a numpy array.
 
             """
 
             # We want everything bar the time column names.
-            num_lines = len(self._lines) - self._header_length
-            if num_lines > 1:
-                for name in self._header:
-                    if name not in self._time_header:
-                        name_index = self._header_indices[name]
-                        data = []
-                        for line in self._lines[self._header_length:]:
-                            if name_index >= len(line):
-                                data.append(np.nan)
-                            else:
-                                data.append(line[name_index])
-                        try:
-                            setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), np.asarray(data, dtype=float))
-                        except ValueError:
-                            # Probably strings so just leave as is. Check for clearly nonsense values, and if we get
-                            # them, replace with NaN.
-                            if any(['*' in i for i in data]):
-                                data = np.asarray(data)
-                                data[data == '*******'] = np.nan
-                                data = data.tolist()
-                            setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), np.asarray(data))
+            if len(self._columns) > 1:
+                names = [i for i in self._header if i not in self._time_header]
+                # Convert all the numeric columns to floats in one go. Copying the transpose gives each variable its
+                # own contiguous (and writeable) row.
+                numeric = [i for i in sorted(set(self._header_indices[name] for name in names))
+                           if pd.api.types.is_numeric_dtype(self._columns[i])]
+                block = np.array(self._columns[numeric].to_numpy(dtype=float).T, order='C')
+                rows = {index: row for row, index in enumerate(numeric)}
+                for name in names:
+                    index = self._header_indices[name]
+                    if index in rows:
+                        setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), block[rows[index]])
+                        continue
+                    data = self._columns[index]
+                    try:
+                        setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), data.to_numpy(dtype=float, copy=True))
+                    except ValueError:
+                        # Probably strings so just leave as is. Check for clearly nonsense values, and if we get
+                        # them, replace with NaN.
+                        data = data.to_numpy(dtype=str)
+                        data[data == '*******'] = np.nan
+                        setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), data)
 
     class _ReadTime(_Read):
         """ Extract the time from the given WCO file. This is meant to be called by the Buoy class. """
 
         def _read(self):
             """
-            Parse the data in self._lines for each of the time series.
+            Parse the data in self._columns for each of the time series.
 
             Provides
             --------
-            Attributes in self which are named for each variable found in `self._lines'. Each attribute contains some
-            time data. We also create a datetime attribute which has the times as datetime objects.
+            Attributes in self which are named for each variable found in `self._columns'. Each attribute contains
+            some time data. We also create a datetime attribute which has the times as a datetime64 array (missing
+            times are NaT). Use datetime_list for the times as a list of datetime objects.
 
             """
 
             # Try everything in self._time_header values.
             self.time_header = []
-            num_lines = len(self._lines) - self._header_length
-            num_columns = len(self._header)
-            if num_lines > 1:
+            if len(self._columns) > 1:
                 for name in self._header:
                     if name in self._time_header:
                         self.time_header.append(name)
-                        name_index = self._header_indices[name]
-                        data = []
-                        for line in self._lines[self._header_length:]:
-                            data.append(line[name_index])
-                        setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), np.asarray(data))
+                        data = self._columns[self._header_indices[name]].to_numpy(dtype=str)
+                        setattr(self, name.strip().replace(' ', '_').replace('(', '').replace(')', ''), data)
 
             # Now make datetime objects from the time.
-            self.datetime = []
+            # The strings are parsed in one go by pandas rather than with datetime.strptime for each time. For the
+            # Western Channel Observatory year/day/time formats, we parse the days and times of day separately as there
+            # are only a few hundred distinct values of each, even in long time series.
+            self.datetime = np.array([], dtype='datetime64[s]')
             if hasattr(self, 'Year') and hasattr(self, 'Serial') and hasattr(self, 'Time'):
                 # First Western Channel Observatory format.
-                for year, doy, time in zip(self.Year, self.Serial, self.Time):
-                    self.datetime.append(datetime.strptime('{y}{doy} {hm}'.format(y=year, doy=doy, hm=time), '%Y%j %H.%M'))
+                days = _parse_datetimes(np.char.add(self.Year, self.Serial), '%Y%j', unique=True)
+                hours = _parse_datetimes(self.Time, '%H.%M', unique=True) - np.datetime64('1900-01-01')
+                self.datetime = (days + hours).astype('datetime64[s]')
             elif hasattr(self, 'Year') and hasattr(self, 'Jd') and hasattr(self, 'Time'):
                 # Different Western Channel Observatory format.
-                for year, doy, time in zip(self.Year, self.Jd, self.Time):
-                    try:
-                        self.datetime.append(datetime.strptime('{y}{doy} {hm}'.format(y=year, doy=doy, hm=time), '%Y%j %H.%M'))
-                    except ValueError:
-                        self.datetime.append(np.nan)
+                days = _parse_datetimes(np.char.add(self.Year, self.Jd), '%Y%j', errors='coerce', unique=True)
+                hours = _parse_datetimes(self.Time, '%H.%M', errors='coerce', unique=True) - np.datetime64('1900-01-01')
+                self.datetime = (days + hours).astype('datetime64[s]')
             elif hasattr(self, 'Date_YYMMDD') and hasattr(self, 'Time_HHMMSS'):
                 # Another different Western Channel Observatory format.
-                for date, time in zip(getattr(self, 'Date_YYMMDD'), getattr(self, 'Time_HHMMSS')):
-                    if date == 'nan' and time == 'nan':
-                        self.datetime.append(np.nan)
-                    else:
-                        self.datetime.append(datetime.strptime('{date} {time}'.format(date=date, time=time), '%y%m%d %H%M%S'))
+                date, time = getattr(self, 'Date_YYMMDD'), getattr(self, 'Time_HHMMSS')
+                stamps = np.char.add(np.char.add(date, ' '), time)
+                # pandas treats 'nan' as a missing time.
+                stamps[(date == 'nan') & (time == 'nan')] = 'nan'
+                self.datetime = _parse_datetimes(stamps, '%y%m%d %H%M%S').astype('datetime64[s]')
             elif hasattr(self, 'Time_GMT'):
                 # CEFAS format.
-                for date in getattr(self, 'Time_GMT'):
-                    self.datetime.append(datetime.strptime(date, '%Y-%m-%d %H:%M:%S'))
+                self.datetime = _parse_datetimes(getattr(self, 'Time_GMT'), '%Y-%m-%d %H:%M:%S').astype('datetime64[s]')
             elif hasattr(self, 'Date/Time_GMT'):
                 # CCO format.
-                for date in getattr(self, 'Date/Time_GMT'):
-                    self.datetime.append(datetime.strptime(date, '%d-%b-%Y %H:%M:%S'))
+                self.datetime = _parse_datetimes(getattr(self, 'Date/Time_GMT'), '%d-%b-%Y %H:%M:%S').astype('datetime64[s]')
+
+        @property
+        def datetime_list(self):
+            """ The times as a list of datetime objects, with np.nan for missing times. """
+            return _datetime_list(self.datetime)
 
         def _fvcom_time_representations(self):
             """
             Convert the datetime object into FVCOM time representations (`time', `Itime' and `Itime2').
 
             """
-            if np.any(self.datetime):
-                self.time = date2num(self.datetime, units='days since 1858-11-17 00:00:00')
+            if not np.all(np.isnat(self.datetime)):
+                # Days since 1858-11-17 00:00:00 (missing times are NaN).
+                self.time = (self.datetime - np.datetime64('1858-11-17')) / np.timedelta64(1, 'D')
                 self.Itime = np.floor(self.time)
                 self.Itime2 = (self.time - self.Itime) * 60 * 60 * 1000
 
@@ -454,18 +1087,75 @@ def _read_header(lines, header_names):
         Indices of each header name in `header' with the name as the key.
 
     """
+    header_names = set(header_names)
     header_length = 0
     for count, line in enumerate(lines):
-        if any(time in line for time in header_names):
-            header_length = count
-        else:
+        if header_names.isdisjoint(line):
             break
+        header_length = count
 
     header_length += 1
 
     # Remove annoying characters from header names.
     header = [i.strip().replace(' ', '_').replace('(', '').replace(')', '') for i in lines[header_length - 1]]
 
-    header_indices = {i: header.index(i) for i in header}
+    # Keep the first position of duplicated names.
+    header_indices = {}
+    for index, name in enumerate(header):
+        header_indices.setdefault(name, index)
 
     return header, header_length, header_indices
+
+
+def _parse_datetimes(stamps, fmt, errors='raise', unique=False):
+    """
+    Convert an array of time strings to datetime64s.
+
+    Parameters
+    ----------
+    stamps : np.ndarray
+        The time strings.
+    fmt : str
+        The strptime format of the strings in `stamps'.
+    errors : str, optional
+        Set to 'coerce' to make times which don't match `fmt' missing rather than raising an error. Defaults to 'raise'.
+    unique : bool, optional
+        Set to True to parse each distinct string only once. This is much faster when there are few distinct strings
+        (e.g. the days in an hourly time series) but slower when they're all different. Defaults to False.
+
+    Returns
+    -------
+    times : np.ndarray
+        The times as datetime64s. Missing times are NaT.
+
+    """
+
+    if unique:
+        stamps, inverse = np.unique(stamps, return_inverse=True)
+
+    times = pd.to_datetime(stamps, format=fmt, errors=errors).to_numpy()
+
+    if unique:
+        times = times[inverse.ravel()]
+
+    return times
+
+
+def _datetime_list(times):
+    """
+    Convert an array of datetime64s to a list of datetime objects.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        The datetime64s.
+
+    Returns
+    -------
+    datetimes : list
+        The datetime objects. Missing times are np.nan.
+
+    """
+
+    # Microseconds so we get datetime objects rather than integers for finer precision times.
+    return np.where(np.isnat(times), np.nan, times.astype('datetime64[us]').astype(object)).tolist()
@@ -1,26 +1,66 @@
 import sys
 import asyncio
-import nest_asyncio
 from pyppeteer import launch
 from pyppeteer.browser import Browser
+from pyppeteer.errors import NetworkError
+from pyppeteer.errors import TimeoutError as PageTimeoutError
 from pyppeteer.page import Page
-# To avoid an error, the following should be invoked.
-nest_asyncio.apply()
+from websockets.exceptions import ConnectionClosed
+# uvloop is a faster event loop; use it if it's installed.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
-async def main(html_url, png_path=None, pdf_path=None, width=1920, height=1080, 
-                   deviceScaleFactor=5, waitFor=3000, clip=None):
+# True once BokehJS has rendered the document (the same check as bokeh.io.export_png).
+BOKEH_RENDERED = '() => window.Bokeh !== undefined && Bokeh.documents.length > 0 && Bokeh.documents[0].is_idle'
+
+async def open_page(width, height, deviceScaleFactor):
+    '''
+    Launch the browser and open a page for exporting the PNGs.
+    '''
+
+    browser = await launch(headless=True)
+    page = await browser.newPage()
+
+    # 'deviceScaleFactor' = DPR (Device Pixel Ratio) = DPI/72
+    # 'hasTouch': True => Activates reloading browser page so that scaling (zooming) with
+    #                     increasing resolution being implemented.
+    # Set once before the first page is loaded so that every page is rendered at this DPR.
+    await page.setViewport({'width': width, 'height': height,
+                            'deviceScaleFactor': deviceScaleFactor,
+                            'hasTouch': True})
+    return browser, page
+
+async def close_browser(browser):
+    '''
+    Close the browser, ignoring the error if the connection to it has already gone.
+    '''
+
+    try:
+        await browser.close()
+    except (NetworkError, ConnectionClosed):
+        pass
+
+async def main(timesteps, width=1920, height=1080, deviceScaleFactor=5, waitFor=30000, clip=None, retries=3):
     '''
     Loading HTML (webpage) and exporting to PNG with specifying DPR using pyppetter
+    for each timestep. A single browser and page are reused for all the timesteps
+    so that Chromium is launched only once.
+    The connection to a long-lived browser can be dropped (`connection unexpectedly
+    closed`, which is why this used to be run once per timestep). When that happens,
+    the browser is relaunched and the timestep is tried again. A page which doesn't
+    load or render in time (e.g. BokehJS can't be fetched from the CDN) is tried again
+    too, and skipped if it still times out, so that it doesn't stop the other timesteps.
     Tested on Ubuntu 20.04 LTS on WSL2
     https://pyppeteer.github.io/pyppeteer/reference.html#browser-class
     https://miyakogi.github.io/pyppeteer/reference.html#page-class
-    
+
     Parameters
     ----------
-    html_url : str
-        e.g.: "file:///home/teem/Github/pyfvcom/examples/png/example.html"
-    out_path : str
-        Output PNG path
+    timesteps : iterable of int
+        Timesteps to export. The HTML URL and PNG path of each timestep are given by
+        html_url_for() and png_path_for().
     width : int, optional
         Viewport width or original image width (adjust in a trial and error manner)
     height : int, optional
@@ -28,42 +68,83 @@ async def main(html_url, png_path=None, pdf_path=None, width=1920, height=1080,
     deviceScaleFactor : int, optional
         DPR (Device Pixel Ratio) = DPI/72. E.g., 5 corresponding to 360 DPI
     waitFor : int, optional
-        Wait for function, timeout, or element which matches on page (milliseconds)
+        Maximum time to wait for each page to load and for the plot to be rendered (milliseconds)
     clip : dict, optional
         Clipping area of the page
-        {"x"(int): x-coordinate of top-left corner of clipping area, "y"(int): y-coordinate, 
+        {"x"(int): x-coordinate of top-left corner of clipping area, "y"(int): y-coordinate,
          "width"(int): width of clipping area, "height"(int): height}
-    '''
+    retries : int, optional
+        Number of times to retry a timestep if the page times out or the connection
+        to the browser is lost (in which case the browser is relaunched first)
 
-    browser = await launch(headless=True)
-    page = await browser.newPage()
+    Returns
+    -------
+    failed : list of int
+        Timesteps which were skipped because they timed out on every attempt
+    '''
 
-    await page.goto(html_url)
-    # 'deviceScaleFactor' = DPR (Device Pixel Ratio) = DPI/72
-    # 'hasTouch': True => Activates reloading browser page so that scaling (zooming) with
-    #                     increasing resolution being implemented.
-    await page.setViewport({'width': width, 'height': height,
-                            'deviceScaleFactor': deviceScaleFactor,
-                            'hasTouch': True})
-    await page.waitFor(5000)
-    #if png_path is not None:
-    # await page.screenshot({'path': out_path, 'scale':1})
-    await page.screenshot(path=png_path, scale=1, clip=clip)
-    #if pdf_path is not None:
-    #    await page.pdf(path=pdf_path, scale=1, width=width, height=height)
-    await browser.close()
+    failed = []
+    browser, page = await open_page(width, height, deviceScaleFactor)
+    try:
+        for timestep in timesteps:
+            html_url = html_url_for(timestep)
+            png_path = png_path_for(timestep)
+            print(f"timestep={timestep}")
+            print(f"png_path={png_path}")
+            print(f"html_url={html_url}")
+            for attempt in range(retries + 1):
+                try:
+                    # Wait until the page (including BokehJS) has loaded and the plot has been
+                    # rendered rather than sleeping for a fixed time.
+                    await page.goto(html_url, {'waitUntil': 'networkidle0', 'timeout': waitFor})
+                    await page.waitForFunction(BOKEH_RENDERED, {'timeout': waitFor})
+                    #if png_path is not None:
+                    # await page.screenshot({'path': out_path, 'scale':1})
+                    await page.screenshot(path=png_path, scale=1, clip=clip)
+                    #if pdf_path is not None:
+                    #    await page.pdf(path=pdf_path, scale=1, width=width, height=height)
+                    break
+                except PageTimeoutError as e:
+                    if attempt == retries:
+                        print(f"Timed out ({e}); skipping timestep={timestep}")
+                        failed.append(timestep)
+                    else:
+                        print(f"Timed out ({e}); retrying timestep={timestep}")
+                except (NetworkError, ConnectionClosed) as e:
+                    if attempt == retries:
+                        raise
+                    print(f"Lost the connection to the browser ({e}); relaunching it and retrying timestep={timestep}")
+                    await close_browser(browser)
+                    browser, page = await open_page(width, height, deviceScaleFactor)
+    finally:
+        await close_browser(browser)
+    if failed:
+        print(f"Failed timesteps: {' '.join(str(t) for t in failed)}")
+    return failed
 
 # Set PNG output file path
 dirpath = "./png/"
 core = "tri_sal_"
 # Adjust width and height in a trial and error manner.
 width=700; height=340
-#for timestep in range(2):
-timestep = int(sys.argv[1])
-print(f"timestep={timestep}")
-html_url = f"file:///home/teem/Github/pyfvcom/examples/png/{core}{timestep:03}.html"
-png_path = f"{dirpath}{core}{timestep:03}.png"
-print(f"png_path={png_path}")
-print(f"html_url={html_url}")
-asyncio.get_event_loop().run_until_complete(main(html_url, \
-    png_path, width=width, height=height))
+
+def html_url_for(timestep):
+    return f"file:///home/teem/Github/pyfvcom/examples/png/{core}{timestep:03}.html"
+
+def png_path_for(timestep):
+    return f"{dirpath}{core}{timestep:03}.png"
+
+if __name__ == '__main__':
+    # Usage: python html2png.py 0 1 2 ...
+    #    or: python html2png.py - (read one timestep per line from stdin until EOF,
+    #        so that a supervising script can pipe timesteps in to a single browser)
+    # To run from a notebook (or anything else with a running event loop), await
+    # main(timesteps, ...) there instead.
+    if sys.argv[1:] == ['-']:
+        timesteps = (int(line) for line in sys.stdin if line.strip())
+    else:
+        timesteps = [int(arg) for arg in sys.argv[1:]]
+    # uvloop.install() is deprecated (uvloop 0.18, Python 3.12), so use uvloop.run() instead.
+    run = uvloop.run if uvloop is not None else asyncio.run
+    failed = run(main(timesteps, width=width, height=height))
+    sys.exit(1 if failed else 0)
@@ -1,14 +1,14 @@
 #!/bin/bash
 # html2png using pyppeteer
-# Do not put in a loop.
-# Currently, an error of `connection unexpectedly closed` occurs; thus necessary to handle manually.
-python html2png.py 0
-python html2png.py 1
-python html2png.py 2
-python html2png.py 3
-python html2png.py 4
-python html2png.py 5
-python html2png.py 6
-python html2png.py 7
-python html2png.py 8
-python html2png.py 9
+# All the timesteps are exported by a single browser, so pass them in one call
+# rather than calling html2png.py once per timestep.
+# Alternatively, pipe the timesteps in one per line: seq 0 9 | python html2png.py -
+# A long-lived browser can fail with `connection unexpectedly closed`; html2png.py then
+# relaunches the browser and retries that timestep (up to `retries` times in main()).
+# A timestep whose page times out is retried too, then skipped; the skipped timesteps are
+# listed at the end and the exit status is 1, so they can be exported again.
+# If it still fails, fall back to exporting one timestep per call, as this script used to:
+#   python html2png.py 0
+#   python html2png.py 1
+#   ...
+python html2png.py 0 1 2 3 4 5 6 7 8 9
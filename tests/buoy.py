@@ -0,0 +1,186 @@
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+import numpy.testing as test
+
+from PyFVCOM.buoy import Buoy, get_buoy_metadata, get_buoy_metadata_df, get_buoy_data, get_buoy_data_columnar, \
+    close_buoy_connections, _get_conn, _table_schema, _pools
+
+
+class BuoyTest(TestCase):
+
+    def setUp(self):
+        """ Make a directory for the fixture files and a small buoy database. """
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.db = str(self.tmpdir / 'buoys.db')
+        con = sqlite3.connect(self.db)
+        con.execute('CREATE TABLE Stations (Name TEXT, Lon REAL, Lat REAL, Id INTEGER)')
+        con.executemany('INSERT INTO Stations VALUES (?, ?, ?, ?)', [('L4', -4.217, 50.250, 1),
+                                                                      ('E1', -4.368, 50.035, 2)])
+        con.execute('CREATE TABLE b0737327 (Year INTEGER, Temperature REAL, Note TEXT)')
+        con.executemany('INSERT INTO b0737327 VALUES (?, ?, ?)', [(2000, None, 'a'), (2001, 11.0, None),
+                                                                   (2002, 12.0, 'c')])
+        con.commit()
+        con.close()
+
+    def tearDown(self):
+        close_buoy_connections()
+        shutil.rmtree(str(self.tmpdir))
+
+    def _write(self, name, lines):
+        """ Write the given lines to `name' in the temporary directory and return its path. """
+        path = self.tmpdir / name
+        path.write_text('\n'.join(lines) + '\n')
+        return path
+
+    def test_l4_space_delimited_empty_cells(self):
+        # Runs of spaces are empty cells in the L4/E1 files, so the columns must not shift left.
+        path = self._write('L4_a.dat', ['Date_YYMMDD Time_HHMMSS Temp Sal',
+                                        '100101 000000 12.5 35.1',
+                                        '100101 010000  35.2',
+                                        '100101 020000 12.7 35.3',
+                                        '  13.0 '])
+        buoy = Buoy(path, station='L4')
+        buoy.load()
+        test.assert_equal(buoy.data.Temp, [12.5, np.nan, 12.7, 13.0])
+        test.assert_equal(buoy.data.Sal, [35.1, 35.2, 35.3, np.nan])
+        test.assert_equal(buoy.time.datetime, np.array(['2010-01-01T00:00:00', '2010-01-01T01:00:00',
+                                                        '2010-01-01T02:00:00', 'NaT'], dtype='datetime64[s]'))
+
+    def test_wco_year_serial(self):
+        path = self._write('L4_2015.txt', ['Year Serial Time  Temp Sal',
+                                           '2015   001 00.00  10.00  35.0',
+                                           '2015   001 01.07  10.10  35.1',
+                                           '2015   032 23.59  -999  35.2'])
+        buoy = Buoy(path, station='L4', missing_value=-999)
+        buoy.load()
+        test.assert_equal(buoy.header, ['Year', 'Serial', 'Time', 'Temp', 'Sal'])
+        test.assert_equal(buoy.data.Temp, [10.0, 10.1, np.nan])
+        test.assert_equal(buoy.data.Sal, [35.0, 35.1, 35.2])
+        test.assert_equal(buoy.time.datetime, np.array(['2015-01-01T00:00:00', '2015-01-01T01:07:00',
+                                                        '2015-02-01T23:59:00'], dtype='datetime64[s]'))
+
+    def test_wco_year_jd_bad_days(self):
+        path = self._write('E1_2016.txt', ['Year  Jd  Time  Temp',
+                                           '2016  40  00.00  9.00',
+                                           '2016  400  01.00  9.10',
+                                           '2016  41  02.30  9.20'])
+        buoy = Buoy(path, station='E1')
+        buoy.load()
+        test.assert_equal(buoy.data.Temp, [9.0, 9.1, 9.2])
+        test.assert_equal(buoy.time.datetime, np.array(['2016-02-09T00:00:00', 'NaT', '2016-02-10T02:30:00'],
+                                                       dtype='datetime64[s]'))
+
+    def test_cefas_trailing_delimiters(self):
+        path = self._write('cefas.csv', ['Time (GMT),Temp,Sal,',
+                                         '2015-01-01 00:00:00,,35.0,,',
+                                         '2015-01-01 01:00:00,10.10,35.1,,',
+                                         '2015-01-01 02:00:00,10.20,35.2,,'])
+        buoy = Buoy(path, station='cefas')
+        buoy.load()
+        test.assert_equal(buoy.header, ['Time_GMT', 'Temp', 'Sal'])
+        test.assert_equal(buoy.data.Temp, [np.nan, 10.1, 10.2])
+        test.assert_equal(buoy.data.Sal, [35.0, 35.1, 35.2])
+        test.assert_equal(buoy.time.datetime, np.array(['2015-01-01T00:00:00', '2015-01-01T01:00:00',
+                                                        '2015-01-01T02:00:00'], dtype='datetime64[s]'))
+
+    def test_short_first_row(self):
+        # Rows shorter than the header are padded with NaNs, including the first one.
+        path = self._write('L4_2015.txt', ['Year Serial Time Temp Sal',
+                                           '2015 001 00.00 1.0',
+                                           '2015 001 01.00 2.0 3'])
+        buoy = Buoy(path, station='L4')
+        buoy.load()
+        test.assert_equal(buoy.data.Temp, [1.0, 2.0])
+        test.assert_equal(buoy.data.Sal, [np.nan, 3.0])
+        path = self._write('cefas.csv', ['Time (GMT),Temp,Sal',
+                                         '2015-01-01 00:00:00,1.0',
+                                         '2015-01-01 01:00:00,2.0,3,,'])
+        buoy = Buoy(path, station='cefas')
+        buoy.load()
+        test.assert_equal(buoy.data.Sal, [np.nan, 3.0])
+        test.assert_equal(buoy.time.datetime, np.array(['2015-01-01T00:00:00', '2015-01-01T01:00:00'],
+                                                       dtype='datetime64[s]'))
+
+    def test_get_buoy_metadata(self):
+        meta = get_buoy_metadata(self.db)
+        test.assert_equal([i['Name'] for i in meta], ['L4', 'E1'])
+        test.assert_equal([i['Id'] for i in meta], [1, 2])
+        test.assert_almost_equal([i['Lon'] for i in meta], [-4.217, -4.368])
+
+    def test_get_buoy_metadata_df(self):
+        meta = get_buoy_metadata_df(self.db)
+        test.assert_equal(list(meta.columns), ['Name', 'Lon', 'Lat', 'Id'])
+        test.assert_equal(meta['Name'].tolist(), ['L4', 'E1'])
+        test.assert_almost_equal(meta['Lat'].to_numpy(), [50.250, 50.035])
+        self.assertTrue(get_buoy_metadata_df(str(self.tmpdir / 'missing.db')).empty)
+
+    def test_get_buoy_data(self):
+        # Table and column names are case insensitive.
+        data = get_buoy_data(self.db, 'B0737327', ['year', 'Temperature'])
+        test.assert_equal(data, [[2000, np.nan], [2001, 11.0], [2002, 12.0]])
+        test.assert_equal(get_buoy_data(self.db, 'b0737327', ['Salinity']), [False])
+        test.assert_equal(get_buoy_data(self.db, 'missing', ['Year']), [False])
+
+    def test_get_buoy_data_columnar(self):
+        data, nulls = get_buoy_data_columnar(self.db, 'b0737327', ['Year', 'Temperature', 'Note'])
+        self.assertEqual(data['Year'].dtype, np.int64)
+        self.assertEqual(data['Note'].dtype, object)
+        test.assert_equal(data['Year'], [2000, 2001, 2002])
+        test.assert_equal(data['Temperature'], [np.nan, 11.0, 12.0])
+        test.assert_equal(data['Note'], ['a', None, 'c'])
+        test.assert_equal(nulls['Temperature'], [True, False, False])
+        test.assert_equal(nulls['Note'], [False, True, False])
+        self.assertEqual(get_buoy_data_columnar(self.db, 'missing', ['Year']), ({}, {}))
+
+    def test_get_buoy_data_columnar_mixed_types(self):
+        # SQLite types are per value, so the declared type of a column doesn't guarantee what's in it.
+        con = sqlite3.connect(self.db)
+        con.execute('CREATE TABLE mixed (When_ DATETIME, Count INTEGER, Value REAL)')
+        con.executemany('INSERT INTO mixed VALUES (?, ?, ?)', [('2010-01-01 00:00:00', 1, 1.5), (None, 2.5, None),
+                                                                ('2010-01-02 00:00:00', None, 2)])
+        con.commit()
+        con.close()
+        data, nulls = get_buoy_data_columnar(self.db, 'mixed', ['When_', 'Count', 'Value'])
+        self.assertEqual(data['When_'].dtype, object)
+        self.assertEqual(data['Count'].dtype, object)
+        self.assertEqual(data['Value'].dtype, np.float64)
+        test.assert_equal(data['When_'], ['2010-01-01 00:00:00', None, '2010-01-02 00:00:00'])
+        test.assert_equal(data['Count'], [1, 2.5, None])
+        test.assert_equal(data['Value'], [1.5, np.nan, 2.0])
+        test.assert_equal(nulls['Count'], [False, False, True])
+
+    def _rebuild(self):
+        """ Replace the database with a new one with a different b0737327 table. """
+        Path(self.db).unlink()
+        con = sqlite3.connect(self.db)
+        con.execute('CREATE TABLE b0737327 (Year INTEGER, Salinity REAL)')
+        con.execute('INSERT INTO b0737327 VALUES (2010, 35.0)')
+        con.commit()
+        con.close()
+
+    def test_rebuilt_database(self):
+        # Reading the database through a different path still shares its connections and cached schemas, but
+        # rebuilding the database must not leave us reading the old one.
+        test.assert_equal(get_buoy_data(self.db, 'b0737327', ['Year']), [[2000], [2001], [2002]])
+        self._rebuild()
+        alias = str(self.tmpdir / '.' / 'buoys.db')
+        test.assert_equal(get_buoy_data(alias, 'b0737327', ['Year', 'Salinity']), [[2010, 35.0]])
+
+    def test_rebuilt_database_while_reading(self):
+        # A reader still using a connection to the old database mustn't leave its schema behind for the new one.
+        with _get_conn(self.db) as (con, pool):
+            self._rebuild()
+            # Notice the new database before the old reader caches the table.
+            get_buoy_metadata(self.db)
+            _table_schema(con, pool, 'b0737327')
+        test.assert_equal(get_buoy_data(self.db, 'b0737327', ['Year', 'Salinity']), [[2010, 35.0]])
+
+    def test_close_buoy_connections(self):
+        get_buoy_data(self.db, 'b0737327', ['Year'])
+        close_buoy_connections(self.db)
+        self.assertNotIn(str(Path(self.db).resolve()), _pools)